@@ -5,114 +5,73 @@ Test google API
 
 from datetime import datetime, timedelta
 import json
-import sys
+import logging
 import unittest
 from io import BytesIO
-
-# Gives a version of zip which returns an iterable even under python 2.
-from builtins import zip  # pylint: disable=redefined-builtin
-
 from itertools import cycle
+
+import ddt
 from mock import patch
 from pytz import UTC
-import six
-from six.moves import range  # use the range function introduced in python 3
 
+from googleapiclient.discovery import build_from_document
 from googleapiclient.http import HttpMockSequence
 from tubular.google_api import BatchRequestError, DriveApi, FOLDER_MIMETYPE, GOOGLE_API_MAX_BATCH_SIZE
 
 # For info about this file, see tubular/tests/discovery-drive.json.README.rst
 DISCOVERY_DRIVE_RESPONSE_FILE = 'tubular/tests/discovery-drive.json'
 
+# Templates for a single part of a multipart batch response to a comment creation request.
+COMMENT_BATCH_PART_SUCCESS = b'''--batch_foobarbaz
+Content-Type: application/http
+Content-Transfer-Encoding: binary
+Content-ID: <response + %(idx)d>
 
-class TestDriveApi(unittest.TestCase):
-    """
-    Test the DriveApi class.
-    """
-    maxDiff = None
-
-    def setUp(self):
-        super(TestDriveApi, self).setUp()
-        with open(DISCOVERY_DRIVE_RESPONSE_FILE, 'r') as f:
-            self.mock_discovery_response_content = f.read()
-
-    @classmethod
-    def _http_mock_sequence_retry(cls):
-        """
-        Returns a tuple, for use in http mock sequences, which represents a response from google suggesting to retry.
-        """
-        return (
-            {'status': '403'},
-            json.dumps({
-                "error": {
-                    "errors": [
-                        {
-                            "domain": "usageLimits",
-                            "reason": "userRateLimitExceeded",
-                            "message": "User Rate Limit Exceeded",
-                        }
-                    ],
-                    "code": 403,
-                    "message": "User Rate Limit Exceeded",
-                }
-            }).encode('utf-8'),
-        )
+HTTP/1.1 204 OK
+ETag: "etag/pony%(idx)d"\r\n\r\n{"id": "fake-comment-id%(idx)d"}
+'''
+COMMENT_BATCH_PART_ERROR = b'''--batch_foobarbaz
+Content-Type: application/http
+Content-Transfer-Encoding: binary
+Content-ID: <response + %(idx)d>
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_create_file_success(self, mock_from_service_account_file):  # pylint: disable=unused-argument
-        """
-        Test normal case for uploading a file.
-        """
-        fake_file_id = 'fake-file-id'
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-            # Then, a request is made to upload the file.
-            ({'status': '200'}, '{{"id": "{}"}}'.format(fake_file_id)),
-        ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
-        response = test_client.create_file_in_folder(
-            'fake-folder-id',
-            'Fake Filename',
-            BytesIO('fake file contents'.encode('ascii')),
-            'text/plain',
-        )
-        assert response == fake_file_id
+HTTP/1.1 500 Internal Server Error
+ETag: "etag/pony%(idx)d"\r\n\r\n
+'''
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    # pylint: disable=unused-argument
-    def test_create_file_retry_success(self, mock_from_service_account_file):
-        """
-        Test rate limit and retry during file upload.
-        """
-        fake_file_id = 'fake-file-id'
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-            # Then, a request is made to upload the file while rate limiting was activated.  This should cause a retry.
-            self._http_mock_sequence_retry(),
-            # Finally, success.
-            ({'status': '200'}, '{{"id": "{}"}}'.format(fake_file_id)),
-        ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
-        response = test_client.create_file_in_folder(
-            'fake-folder-id',
-            'Fake Filename',
-            BytesIO('fake file contents'.encode('ascii')),
-            'text/plain',
-        )
-        # There is no need to explicitly check if the call was retried because
-        # the response value cannot possibly contain fake_file_id otherwise,
-        # since it was only passed in the last response.
-        assert response == fake_file_id
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_delete_file_success(self, mock_from_service_account_file):  # pylint: disable=unused-argument
-        """
-        Test normal case for deleting files.
-        """
-        fake_file_ids = ['fake-file-id1', 'fake-file-id2']
-        batch_response = b'''--batch_foobarbaz
+def _build_batch_response(parts):
+    """
+    Returns a multipart batch response body made of the given (template, idx) parts, in order.
+    """
+    body = bytearray()
+    for template, idx in parts:
+        if body:
+            body += b'\n'
+        body += template % {b'idx': idx}
+    body += b'--batch_foobarbaz--'
+    return bytes(body)
+
+
+# Batch responses used by the batching/retry test.  They never vary, so build them once at import time.
+# First batch: a full batch of successful results.
+COMMENT_BATCH_RESPONSE_0 = _build_batch_response(
+    (COMMENT_BATCH_PART_SUCCESS, n) for n in range(GOOGLE_API_MAX_BATCH_SIZE)
+)
+# Second batch: only the first half succeeds, the rest resulted in HTTP 500.
+COMMENT_BATCH_RESPONSE_1 = _build_batch_response(
+    (COMMENT_BATCH_PART_SUCCESS if n < int(GOOGLE_API_MAX_BATCH_SIZE * 0.25) else COMMENT_BATCH_PART_ERROR, n)
+    for n in range(int(GOOGLE_API_MAX_BATCH_SIZE * 0.5))
+)
+# Retry of the failed half of the second batch: all succeed.
+COMMENT_BATCH_RESPONSE_2 = _build_batch_response(
+    (COMMENT_BATCH_PART_SUCCESS, n)
+    for n in range(int(GOOGLE_API_MAX_BATCH_SIZE * 0.25), int(GOOGLE_API_MAX_BATCH_SIZE * 0.5))
+)
+
+# Batch responses used by the batch request logging tests.
+# Deleting two files, both of which exist.
+DELETE_BATCH_RESPONSE = b'''--batch_foobarbaz
 Content-Type: application/http
 Content-Transfer-Encoding: binary
 Content-ID: <response + 0>
@@ -128,34 +87,8 @@ Content-ID: <response + 1>
 HTTP/1.1 204 OK
 ETag: "etag/sheep"\r\n\r\n
 --batch_foobarbaz--'''
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-            # Then, a request is made to delete files.
-            ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'}, batch_response),
-        ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
-        if sys.version_info < (3, 4):
-            # This is a simple smoke-test without checking the output because
-            # python <3.4 doesn't support assertLogs.
-            test_client.delete_files(fake_file_ids)
-        else:
-            # This is the full test case, which only runs under python 3.4+.
-            with self.assertLogs(level='INFO') as captured_logs:  # pylint: disable=no-member
-                test_client.delete_files(fake_file_ids)
-            assert sum(
-                'Successfully processed request' in msg
-                for msg in captured_logs.output
-            ) == 2
-
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_delete_file_with_nonexistent_file(self, mock_from_service_account_file):  # pylint: disable=unused-argument
-        """
-        Test case for deleting files where some are nonexistent.
-        """
-        fake_file_id_non_existent = 'fake-file-id1'
-        fake_file_id_exists = 'fake-file-id2'
-        batch_response = b'''--batch_foobarbaz
+# Deleting two files, where the first one is nonexistent.
+DELETE_BATCH_RESPONSE_NONEXISTENT_FILE = b'''--batch_foobarbaz
 Content-Type: application/http
 Content-Transfer-Encoding: binary
 Content-ID: <response + 0>
@@ -187,35 +120,243 @@ Content-ID: <response + 1>
 HTTP/1.1 204 OK
 ETag: "etag/sheep"\r\n\r\n
 --batch_foobarbaz--'''
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-            # Then, a request is made to delete files.
-            ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'}, batch_response),
+# Commenting on two files, where the first one is nonexistent.
+COMMENT_BATCH_RESPONSE_NONEXISTENT_FILE = b'''--batch_foobarbaz
+Content-Type: application/http
+Content-Transfer-Encoding: binary
+Content-ID: <response + 0>
+
+HTTP/1.1 404 NOT FOUND
+Content-Type: application/json
+Content-length: 266
+ETag: "etag/pony"\r\n\r\n{
+ "error": {
+  "errors": [
+   {
+    "domain": "global",
+    "reason": "notFound",
+    "message": "File not found: fake-file-id0.",
+    "locationType": "parameter",
+    "location": "fileId"
+   }
+  ],
+  "code": 404,
+  "message": "File not found: fake-file-id0."
+ }
+}
+
+--batch_foobarbaz
+Content-Type: application/http
+Content-Transfer-Encoding: binary
+Content-ID: <response + 1>
+
+HTTP/1.1 204 OK
+ETag: "etag/sheep"\r\n\r\n{"id": "fake-comment-id1"}
+--batch_foobarbaz--'''
+# Listing permissions on three files, where the last one is nonexistent.
+PERMISSIONS_BATCH_RESPONSE_ONE_FAILURE = b'''--batch_foobarbaz
+Content-Type: application/http
+Content-Transfer-Encoding: binary
+Content-ID: <response + 0>
+
+HTTP/1.1 200 OK
+Content-Type: application/json
+ETag: "etag/pony"\r\n\r\n{"permissions": [{"emailAddress": "reader@example.com", "role": "reader"}]}
+
+--batch_foobarbaz
+Content-Type: application/http
+Content-Transfer-Encoding: binary
+Content-ID: <response + 1>
+
+HTTP/1.1 200 OK
+Content-Type: application/json
+ETag: "etag/sheep"\r\n\r\n{"permissions": [{"emailAddress": "writer@example.com", "role": "writer"}]}
+
+--batch_foobarbaz
+Content-Type: application/http
+Content-Transfer-Encoding: binary
+Content-ID: <response + 2>
+
+HTTP/1.1 404 NOT FOUND
+Content-Type: application/json
+Content-length: 266
+ETag: "etag/bird"\r\n\r\n{
+ "error": {
+  "errors": [
+   {
+    "domain": "global",
+    "reason": "notFound",
+    "message": "File not found: fake-file-id2.",
+    "locationType": "parameter",
+    "location": "fileId"
+   }
+  ],
+  "code": 404,
+  "message": "File not found: fake-file-id2."
+ }
+}
+--batch_foobarbaz--'''
+
+
+class LogMessageCounter(logging.Handler):
+    """
+    Logging handler which counts, as records arrive, how many messages contain each of the given substrings.
+    """
+    def __init__(self, *substrings):
+        super(LogMessageCounter, self).__init__(level=logging.INFO)
+        self.counts = dict.fromkeys(substrings, 0)
+
+    def emit(self, record):
+        message = record.getMessage()
+        for substring in self.counts:
+            if substring in message:
+                self.counts[substring] += 1
+
+
+@ddt.ddt
+class TestDriveApi(unittest.TestCase):
+    """
+    Test the DriveApi class.
+    """
+    maxDiff = None
+
+    # A tuple, for use in http mock sequences, which represents a response from google suggesting to retry.
+    _RETRY_RESPONSE = (
+        {'status': '403'},
+        json.dumps({
+            "error": {
+                "errors": [
+                    {
+                        "domain": "usageLimits",
+                        "reason": "userRateLimitExceeded",
+                        "message": "User Rate Limit Exceeded",
+                    }
+                ],
+                "code": 403,
+                "message": "User Rate Limit Exceeded",
+            }
+        }).encode('utf-8'),
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestDriveApi, cls).setUpClass()
+        # The discovery document never changes between tests, so read and parse it only once.  The client library
+        # adds its own fix-ups to the method descriptions the first time they are used, but those are the same every
+        # time, so the parsed document can safely be shared by all the clients built in these tests.
+        with open(DISCOVERY_DRIVE_RESPONSE_FILE, 'rb') as f:
+            cls.mock_discovery_document = json.load(f)
+
+        # Subfolder listings shared by the walk_files tests which only request folders.  The serialized responses
+        # never vary, so encode them once.
+        fake_folders = [
+            {
+                'id': f'fake-folder-id-{idx}',
+                'name': f'fake-folder-name-{idx}',
+                'mimeType': 'application/vnd.google-apps.folder'
+            }
+            for idx in range(10)
+        ]
+        cls._FAKE_FOLDERS_RESPONSE = json.dumps({'files': fake_folders}).encode('utf-8')
+        cls._FAKE_FOLDERS_PAGE_1_RESPONSE = json.dumps(
+            {'files': fake_folders[:7], 'nextPageToken': 'fake-next-page-token'}
+        ).encode('utf-8')
+        cls._FAKE_FOLDERS_PAGE_2_RESPONSE = json.dumps({'files': fake_folders[7:]}).encode('utf-8')
+        # walk_files omits the mimeType from its results, so compare against the folders without it.  This is shared
+        # by several tests, so keep it a tuple to guard against any test modifying it.
+        cls._FAKE_FOLDERS_WITHOUT_MIMETYPE = tuple(
+            {'id': fake_folder['id'], 'name': fake_folder['name']}
+            for fake_folder in fake_folders
+        )
+
+    def setUp(self):
+        super(TestDriveApi, self).setUp()
+        # None of the tests use real credentials, so skip loading the service account secrets file.
+        patcher = patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Build clients from the already parsed discovery document instead of fetching and parsing it every time.
+        patcher = patch('tubular.google_api.build', new=self._build_from_discovery_document)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @classmethod
+    def _build_from_discovery_document(cls, service_name, version, **kwargs):
+        """
+        Stand-in for googleapiclient.discovery.build which uses the cached Drive discovery document.
+        """
+        assert (service_name, version) == ('drive', 'v3')
+        return build_from_document(cls.mock_discovery_document, **kwargs)
+
+    def _count_log_messages(self, *substrings):
+        """
+        Starts counting the INFO and higher log messages containing each of the given substrings, for the rest of the
+        test.
+
+        Returns:
+            dict mapping of substring to the number of messages logged so far which contain it.
+        """
+        counter = LogMessageCounter(*substrings)
+        root_logger = logging.getLogger()
+        self.addCleanup(root_logger.setLevel, root_logger.level)
+        root_logger.setLevel(logging.INFO)
+        root_logger.addHandler(counter)
+        self.addCleanup(root_logger.removeHandler, counter)
+        return counter.counts
+
+    def _make_client(self, responses):
+        """
+        Returns a DriveApi client backed by an http mock sequence of the given responses.
+        """
+        return DriveApi('non-existent-secrets.json', http=HttpMockSequence(responses))
+
+    def test_create_file_success(self):
+        """
+        Test normal case for uploading a file.
+        """
+        fake_file_id = 'fake-file-id'
+        test_client = self._make_client([
+            # First, a request is made to upload the file.
+            ({'status': '200'}, b'{"id": "%s"}' % fake_file_id.encode('ascii')),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
-        if sys.version_info < (3, 4):
-            # This is a simple smoke-test without checking the output because
-            # python 2 doesn't support assertLogs.
-            with self.assertRaises(BatchRequestError):
-                test_client.delete_files([fake_file_id_non_existent, fake_file_id_exists])
-        else:
-            # This is the full test case, which only runs under python 3.
-            with self.assertLogs(level='INFO') as captured_logs:  # pylint: disable=no-member
-                with self.assertRaises(BatchRequestError):
-                    test_client.delete_files([fake_file_id_non_existent, fake_file_id_exists])
-            assert sum('Error processing request' in msg for msg in captured_logs.output) == 1
-            assert sum('Successfully processed request' in msg for msg in captured_logs.output) == 1
+        response = test_client.create_file_in_folder(
+            'fake-folder-id',
+            'Fake Filename',
+            BytesIO(b'fake file contents'),
+            'text/plain',
+        )
+        assert response == fake_file_id
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_delete_files_older_than(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_create_file_retry_success(self):
+        """
+        Test rate limit and retry during file upload.
+        """
+        fake_file_id = 'fake-file-id'
+        test_client = self._make_client([
+            # First, a request is made to upload the file while rate limiting was activated.  This should cause a retry.
+            self._RETRY_RESPONSE,
+            # Finally, success.
+            ({'status': '200'}, b'{"id": "%s"}' % fake_file_id.encode('ascii')),
+        ])
+        response = test_client.create_file_in_folder(
+            'fake-folder-id',
+            'Fake Filename',
+            BytesIO(b'fake file contents'),
+            'text/plain',
+        )
+        # There is no need to explicitly check if the call was retried because
+        # the response value cannot possibly contain fake_file_id otherwise,
+        # since it was only passed in the last response.
+        assert response == fake_file_id
+
+    def test_delete_files_older_than(self):
         """
         Tests the logic to delete files older than a certain age.
         """
         five_days_ago = datetime.now(UTC) - timedelta(days=5)
         fake_newish_files = [
             {
-                'id': 'fake-text-file-id-{}'.format(idx),
+                'id': f'fake-text-file-id-{idx}',
                 'createdTime': five_days_ago + timedelta(days=1),
                 'mimeType': 'text/plain'
             }
@@ -223,33 +364,26 @@ ETag: "etag/sheep"\r\n\r\n
         ]
         fake_old_files = [
             {
-                'id': 'fake-text-file-id-{}'.format(idx),
+                'id': f'fake-text-file-id-{idx}',
                 'createdTime': five_days_ago - timedelta(days=14),
                 'mimeType': 'text/plain'
             }
             for idx in range(2, 10, 2)
         ]
         fake_files = fake_newish_files + fake_old_files
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            (
-                {'status': '200'},
-                self.mock_discovery_response_content,
-            ),
-            # Then, a request is made to list files.
+        test_client = self._make_client([
+            # First, a request is made to list files.
             (
                 {'status': '200', 'content-type': 'application/json'},
                 json.dumps({'files': fake_files}, default=lambda x: x.isoformat()).encode('utf-8'),
             ),
         ])
         with patch.object(DriveApi, 'delete_files', return_value=None) as mock_delete_files:
-            test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
             test_client.delete_files_older_than('fake-folder-id', five_days_ago)
         # Verify that the correct files were requested to be deleted.
-        mock_delete_files.assert_called_once_with(['fake-text-file-id-{}'.format(idx) for idx in range(2, 10, 2)])
+        mock_delete_files.assert_called_once_with([f'fake-text-file-id-{idx}' for idx in range(2, 10, 2)])
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_walk_files_multi_page_all_types(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_walk_files_multi_page_all_types(self):
         """
         Files are searched for - and returned in two pages.
         """
@@ -262,16 +396,16 @@ ETag: "etag/sheep"\r\n\r\n
         ]
         fake_text_files = [
             {
-                'id': 'fake-text-file-id-{}'.format(idx),
-                'name': 'fake-text-file-name-{}'.format(idx),
+                'id': f'fake-text-file-id-{idx}',
+                'name': f'fake-text-file-name-{idx}',
                 'mimeType': 'text/plain'
             }
             for idx in range(10)
         ]
         fake_csv_files = [
             {
-                'id': 'fake-csv-file-id-{}'.format(idx),
-                'name': 'fake-csv-file-name-{}'.format(idx),
+                'id': f'fake-csv-file-id-{idx}',
+                'name': f'fake-csv-file-name-{idx}',
                 'mimeType': 'application/csv'
             }
             for idx in range(10)
@@ -279,13 +413,8 @@ ETag: "etag/sheep"\r\n\r\n
         fake_files_part_1 = fake_folder + fake_text_files[:3] + fake_csv_files[:3]
         fake_files_part_2 = fake_text_files[3:7] + fake_csv_files[3:8]
         fake_files_part_3 = fake_text_files[7:] + fake_csv_files[8:]
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            (
-                {'status': '200'},
-                self.mock_discovery_response_content,
-            ),
-            # Then, a request is made to list files.  The response contains a single folder and other files.
+        test_client = self._make_client([
+            # First, a request is made to list files.  The response contains a single folder and other files.
             (
                 {'status': '200', 'content-type': 'application/json'},
                 json.dumps({'files': fake_files_part_1}).encode('utf-8'),
@@ -303,7 +432,6 @@ ETag: "etag/sheep"\r\n\r\n
                 json.dumps({'files': fake_files_part_3}).encode('utf-8'),
             ),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
         response = test_client.walk_files('fake-folder-id')
         # Remove all the mimeTypes for comparison purposes.
         del fake_folder[0]['mimeType']
@@ -311,10 +439,9 @@ ETag: "etag/sheep"\r\n\r\n
             del fake_file['mimeType']
         for fake_file in fake_csv_files:
             del fake_file['mimeType']
-        six.assertCountEqual(self, response, fake_folder + fake_text_files + fake_csv_files)
+        self.assertCountEqual(response, fake_folder + fake_text_files + fake_csv_files)
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_walk_files_multi_page_csv_only(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_walk_files_multi_page_csv_only(self):
         """
         Files are searched for - and returned in two pages.
         """
@@ -327,8 +454,8 @@ ETag: "etag/sheep"\r\n\r\n
         ]
         fake_csv_files = [
             {
-                'id': 'fake-csv-file-id-{}'.format(idx),
-                'name': 'fake-csv-file-name-{}'.format(idx),
+                'id': f'fake-csv-file-id-{idx}',
+                'name': f'fake-csv-file-name-{idx}',
                 'mimeType': 'application/csv'
             }
             for idx in range(10)
@@ -336,13 +463,8 @@ ETag: "etag/sheep"\r\n\r\n
         fake_files_part_1 = fake_folder + fake_csv_files[:3]
         fake_files_part_2 = fake_csv_files[3:8]
         fake_files_part_3 = fake_csv_files[8:]
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            (
-                {'status': '200'},
-                self.mock_discovery_response_content,
-            ),
-            # Then, a request is made to list files.  The response contains a single folder and other files.
+        test_client = self._make_client([
+            # First, a request is made to list files.  The response contains a single folder and other files.
             (
                 {'status': '200', 'content-type': 'application/json'},
                 json.dumps({'files': fake_files_part_1}).encode('utf-8'),
@@ -360,121 +482,64 @@ ETag: "etag/sheep"\r\n\r\n
                 json.dumps({'files': fake_files_part_3}).encode('utf-8'),
             ),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
         response = test_client.walk_files('fake-folder-id', mimetype='application/csv')
         # Remove all the mimeTypes for comparison purposes.
         for fake_file in fake_csv_files:
             del fake_file['mimeType']
-        six.assertCountEqual(self, response, fake_csv_files)
+        self.assertCountEqual(response, fake_csv_files)
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_walk_files_one_page(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_walk_files_one_page(self):
         """
         Simple case where subfolders are requested, and the response contains one page.
         """
-        fake_folders = [
-            {
-                'id': 'fake-folder-id-{}'.format(idx),
-                'name': 'fake-folder-name-{}'.format(idx),
-                'mimeType': 'application/vnd.google-apps.folder'
-            }
-            for idx in range(10)
-        ]
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            (
-                {'status': '200'},
-                self.mock_discovery_response_content,
-            ),
-            # Then, a request is made to list files.
+        test_client = self._make_client([
+            # First, a request is made to list files.
             (
                 {'status': '200', 'content-type': 'application/json'},
-                json.dumps({'files': fake_folders}).encode('utf-8'),
+                self._FAKE_FOLDERS_RESPONSE,
             ),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
         response = test_client.walk_files('fake-folder-id', mimetype=FOLDER_MIMETYPE, recurse=False)
-        # Remove all the mimeTypes for comparison purposes.
-        for fake_folder in fake_folders:
-            del fake_folder['mimeType']
-        six.assertCountEqual(self, response, fake_folders)
+        self.assertCountEqual(response, self._FAKE_FOLDERS_WITHOUT_MIMETYPE)
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_walk_files_two_page(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_walk_files_two_page(self):
         """
         Subfolders are requested, but the response is paginated.
         """
-        fake_folders = [
-            {
-                'id': 'fake-folder-id-{}'.format(idx),
-                'name': 'fake-folder-name-{}'.format(idx),
-                'mimeType': 'application/vnd.google-apps.folder'
-            }
-            for idx in range(10)
-        ]
-        fake_files_part_1 = fake_folders[:7]
-        fake_files_part_2 = fake_folders[7:]
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            (
-                {'status': '200'},
-                self.mock_discovery_response_content,
-            ),
-            # Then, a request is made to list files.  The response contains a nextPageToken suggesting there are more
+        test_client = self._make_client([
+            # First, a request is made to list files.  The response contains a nextPageToken suggesting there are more
             # pages.
             (
                 {'status': '200', 'content-type': 'application/json'},
-                json.dumps({'files': fake_files_part_1, 'nextPageToken': 'fake-next-page-token'}).encode('utf-8'),
+                self._FAKE_FOLDERS_PAGE_1_RESPONSE,
             ),
             # Finally, a second list request is made.  This time, no nextPageToken is present in the response,
             # suggesting there are no more pages.
             (
                 {'status': '200', 'content-type': 'application/json'},
-                json.dumps({'files': fake_files_part_2}).encode('utf-8'),
+                self._FAKE_FOLDERS_PAGE_2_RESPONSE,
             ),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
         response = test_client.walk_files('fake-folder-id', mimetype=FOLDER_MIMETYPE, recurse=False)
-        # Remove all the mimeTypes for comparison purposes.
-        for fake_folder in fake_folders:
-            del fake_folder['mimeType']
-        six.assertCountEqual(self, response, fake_folders)
+        self.assertCountEqual(response, self._FAKE_FOLDERS_WITHOUT_MIMETYPE)
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_walk_files_retry(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_walk_files_retry(self):
         """
         Subfolders are requested, but there is rate limiting causing a retry.
         """
-        fake_folders = [
-            {
-                'id': 'fake-folder-id-{}'.format(idx),
-                'name': 'fake-folder-name-{}'.format(idx),
-                'mimeType': 'application/vnd.google-apps.folder'
-            }
-            for idx in range(10)
-        ]
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            (
-                {'status': '200'},
-                self.mock_discovery_response_content),
-            # Then, a request is made to list files, but the response suggests to retry.
-            self._http_mock_sequence_retry(),
+        test_client = self._make_client([
+            # First, a request is made to list files, but the response suggests to retry.
+            self._RETRY_RESPONSE,
             # Finally, the request is retried, and the response is OK.
             (
                 {'status': '200', 'content-type': 'application/json'},
-                json.dumps({'files': fake_folders}).encode('utf-8'),
+                self._FAKE_FOLDERS_RESPONSE,
             ),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
         response = test_client.walk_files('fake-folder-id', mimetype=FOLDER_MIMETYPE, recurse=False)
-        # Remove all the mimeTypes for comparison purposes.
-        for fake_folder in fake_folders:
-            del fake_folder['mimeType']
-        six.assertCountEqual(self, response, fake_folders)
+        self.assertCountEqual(response, self._FAKE_FOLDERS_WITHOUT_MIMETYPE)
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_comment_files_success(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_comment_files_success(self):
         """
         Test normal case for commenting on files.
         """
@@ -495,16 +560,12 @@ Content-ID: <response + 1>
 HTTP/1.1 204 OK
 ETag: "etag/sheep"\r\n\r\n{"id": "fake-comment-id1"}
 --batch_foobarbaz--'''
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-            # Then, a request is made to add comments to the files.
+        test_client = self._make_client([
+            # First, a request is made to add comments to the files.
             ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'}, batch_response),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
         resp = test_client.create_comments_for_files(list(zip(fake_file_ids, cycle(['some comment message']))))
-        six.assertCountEqual(
-            self,
+        self.assertCountEqual(
             resp,
             {
                 'fake-file-id0': {'id': 'fake-comment-id0'},
@@ -512,158 +573,51 @@ ETag: "etag/sheep"\r\n\r\n{"id": "fake-comment-id1"}
             },
         )
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_comment_files_batching_retries(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_comment_files_batching_retries(self):
         """
         Test commenting on more files than the google API batch limit.  This also tests the partial retry
         mechanism when a subset of responses are rate limited.
         """
         num_files = int(GOOGLE_API_MAX_BATCH_SIZE * 1.5)
-        fake_file_ids = ['fake-file-id{}'.format(n) for n in range(num_files)]
-        batch_response_0 = '\n'.join(
-            '''--batch_foobarbaz
-Content-Type: application/http
-Content-Transfer-Encoding: binary
-Content-ID: <response + {idx}>
-
-HTTP/1.1 204 OK
-ETag: "etag/pony{idx}"\r\n\r\n{{"id": "fake-comment-id{idx}"}}
-'''.format(idx=n)
-            for n in range(GOOGLE_API_MAX_BATCH_SIZE)
-        )
-        batch_response_0 += '--batch_foobarbaz--'
-        batch_response_1 = '\n'.join(
-            '''--batch_foobarbaz
-Content-Type: application/http
-Content-Transfer-Encoding: binary
-Content-ID: <response + {idx}>
-
-HTTP/1.1 204 OK
-ETag: "etag/pony{idx}"\r\n\r\n{{"id": "fake-comment-id{idx}"}}
-'''.format(idx=n)
-            for n in range(int(GOOGLE_API_MAX_BATCH_SIZE * 0.25))
-        )
-        batch_response_1 += '\n'
-        batch_response_1 += '\n'.join(
-            '''--batch_foobarbaz
-Content-Type: application/http
-Content-Transfer-Encoding: binary
-Content-ID: <response + {idx}>
-
-HTTP/1.1 500 Internal Server Error
-ETag: "etag/pony{idx}"\r\n\r\n
-'''.format(idx=n)
-            for n in range(int(GOOGLE_API_MAX_BATCH_SIZE * 0.25), int(GOOGLE_API_MAX_BATCH_SIZE * 0.5))
-        )
-        batch_response_1 += '--batch_foobarbaz--'
-        batch_response_2 = '\n'.join(
-            '''--batch_foobarbaz
-Content-Type: application/http
-Content-Transfer-Encoding: binary
-Content-ID: <response + {idx}>
-
-HTTP/1.1 204 OK
-ETag: "etag/pony{idx}"\r\n\r\n{{"id": "fake-comment-id{idx}"}}
-'''.format(idx=n)
-            for n in range(int(GOOGLE_API_MAX_BATCH_SIZE * 0.25), int(GOOGLE_API_MAX_BATCH_SIZE * 0.5))
-        )
-        batch_response_2 += '--batch_foobarbaz--'
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-            # Then, a request is made to add comments to the files, first batch. Return max batch size results.
-            ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'}, batch_response_0),
+        fake_file_ids = [f'fake-file-id{n}' for n in range(num_files)]
+        test_client = self._make_client([
+            # First, a request is made to add comments to the files, first batch. Return max batch size results.
+            (
+                {'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'},
+                COMMENT_BATCH_RESPONSE_0,
+            ),
             # Then, a request is made to add comments to the files, second batch. Only half of the results are returned,
             # the rest resulted in HTTP 500.
-            ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'}, batch_response_1),
+            (
+                {'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'},
+                COMMENT_BATCH_RESPONSE_1,
+            ),
             # Then, a request is made retry the last half of the second batch (only the ones that returned the 500s).
             # Return the last 1/4 results.
-            ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'}, batch_response_2),
+            (
+                {'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'},
+                COMMENT_BATCH_RESPONSE_2,
+            ),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
         resp = test_client.create_comments_for_files(list(zip(fake_file_ids, cycle(['some comment message']))))
-        six.assertCountEqual(
-            self,
+        self.assertCountEqual(
             resp,
             {
-                'fake-file-id{}'.format(n): {'id': 'fake-comment-id{}'.format(n)}
+                f'fake-file-id{n}': {'id': f'fake-comment-id{n}'}
                 for n in range(num_files)
             },
         )
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_comment_files_with_nonexistent_file(self, mock_from_service_account_file):  # pylint: disable=unused-argument
-        """
-        Test case for commenting on files, where some files are nonexistent.
-        """
-        fake_file_ids = ['fake-file-id0', 'fake-file-id1']
-        batch_response = b'''--batch_foobarbaz
-Content-Type: application/http
-Content-Transfer-Encoding: binary
-Content-ID: <response + 0>
-
-HTTP/1.1 404 NOT FOUND
-Content-Type: application/json
-Content-length: 266
-ETag: "etag/pony"\r\n\r\n{
- "error": {
-  "errors": [
-   {
-    "domain": "global",
-    "reason": "notFound",
-    "message": "File not found: fake-file-id0.",
-    "locationType": "parameter",
-    "location": "fileId"
-   }
-  ],
-  "code": 404,
-  "message": "File not found: fake-file-id0."
- }
-}
-
---batch_foobarbaz
-Content-Type: application/http
-Content-Transfer-Encoding: binary
-Content-ID: <response + 1>
-
-HTTP/1.1 204 OK
-ETag: "etag/sheep"\r\n\r\n{"id": "fake-comment-id1"}
---batch_foobarbaz--'''
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-            # Then, a request is made to add comments to the files.
-            ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'}, batch_response),
-        ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
-        if sys.version_info < (3, 4):
-            # This is a simple smoke-test without checking the output because python <3.4 doesn't support assertLogs.
-            with self.assertRaises(BatchRequestError):
-                test_client.create_comments_for_files(list(zip(fake_file_ids, cycle(['some comment message']))))
-        else:
-            # This is the full test case, which only runs under python 3.4+.
-            with self.assertLogs(level='INFO') as captured_logs:  # pylint: disable=no-member
-                with self.assertRaises(BatchRequestError):
-                    test_client.create_comments_for_files(list(zip(fake_file_ids, cycle(['some comment message']))))
-            assert sum('Successfully processed request' in msg for msg in captured_logs.output) == 1
-            assert sum('Error processing request' in msg for msg in captured_logs.output) == 1
-
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_comment_files_with_duplicate_file(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_comment_files_with_duplicate_file(self):
         """
         Test case for duplicate file IDs.
         """
         fake_file_ids = ['fake-file-id0', 'fake-file-id1', 'fake-file-id0']
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-        ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
+        test_client = self._make_client([])
         with self.assertRaises(ValueError):
             test_client.create_comments_for_files(list(zip(fake_file_ids, cycle(['some comment message']))))
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_list_permissions_success(self, mock_from_service_account_file):  # pylint: disable=unused-argument
+    def test_list_permissions_success(self):
         """
         Test normal case for listing permissions on files.
         """
@@ -686,16 +640,12 @@ HTTP/1.1 200 OK
 Content-Type: application/json
 ETag: "etag/sheep"\r\n\r\n{"permissions": [{"emailAddress": "writer@example.com", "role": "writer"}]}
 --batch_foobarbaz--'''
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-            # Then, a request is made to add comments to the files.
+        test_client = self._make_client([
+            # First, a request is made to add comments to the files.
             ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'}, batch_response),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
         resp = test_client.list_permissions_for_files(fake_file_ids)
-        six.assertCountEqual(
-            self,
+        self.assertCountEqual(
             resp,
             {
                 'fake-file-id0': [{'emailAddress': 'reader@example.com', 'role': 'reader'}],
@@ -703,70 +653,43 @@ ETag: "etag/sheep"\r\n\r\n{"permissions": [{"emailAddress": "writer@example.com"
             },
         )
 
-    @patch('tubular.google_api.service_account.Credentials.from_service_account_file', return_value=None)
-    def test_list_permissions_one_failure(self, mock_from_service_account_file):  # pylint: disable=unused-argument
-        """
-        Test case for listing permissions on files, but one file doesn't exist.
-        """
-        fake_file_ids = ['fake-file-id0', 'fake-file-id1', 'fake-file-id2']
-        batch_response = b'''--batch_foobarbaz
-Content-Type: application/http
-Content-Transfer-Encoding: binary
-Content-ID: <response + 0>
-
-HTTP/1.1 200 OK
-Content-Type: application/json
-ETag: "etag/pony"\r\n\r\n{"permissions": [{"emailAddress": "reader@example.com", "role": "reader"}]}
-
---batch_foobarbaz
-Content-Type: application/http
-Content-Transfer-Encoding: binary
-Content-ID: <response + 1>
-
-HTTP/1.1 200 OK
-Content-Type: application/json
-ETag: "etag/sheep"\r\n\r\n{"permissions": [{"emailAddress": "writer@example.com", "role": "writer"}]}
-
---batch_foobarbaz
-Content-Type: application/http
-Content-Transfer-Encoding: binary
-Content-ID: <response + 2>
-
-HTTP/1.1 404 NOT FOUND
-Content-Type: application/json
-Content-length: 266
-ETag: "etag/bird"\r\n\r\n{
- "error": {
-  "errors": [
-   {
-    "domain": "global",
-    "reason": "notFound",
-    "message": "File not found: fake-file-id2.",
-    "locationType": "parameter",
-    "location": "fileId"
-   }
-  ],
-  "code": 404,
-  "message": "File not found: fake-file-id2."
- }
-}
---batch_foobarbaz--'''
-        http_mock_sequence = HttpMockSequence([
-            # First, a request is made to the discovery API to construct a client object for Drive.
-            ({'status': '200'}, self.mock_discovery_response_content),
-            # Then, a request is made to add comments to the files.
+    @ddt.data(
+        # Deleting files, all of which exist.
+        ('delete_files', ['fake-file-id1', 'fake-file-id2'], DELETE_BATCH_RESPONSE, 2, 0),
+        # Deleting files, where some are nonexistent.
+        ('delete_files', ['fake-file-id1', 'fake-file-id2'], DELETE_BATCH_RESPONSE_NONEXISTENT_FILE, 1, 1),
+        # Commenting on files, where some files are nonexistent.
+        (
+            'create_comments_for_files',
+            list(zip(['fake-file-id0', 'fake-file-id1'], cycle(['some comment message']))),
+            COMMENT_BATCH_RESPONSE_NONEXISTENT_FILE,
+            1,
+            1,
+        ),
+        # Listing permissions on files, but one file doesn't exist.
+        (
+            'list_permissions_for_files',
+            ['fake-file-id0', 'fake-file-id1', 'fake-file-id2'],
+            PERMISSIONS_BATCH_RESPONSE_ONE_FAILURE,
+            2,
+            1,
+        ),
+    )
+    @ddt.unpack
+    def test_batch_request_logging(self, method_name, method_arg, batch_response, num_successes, num_errors):
+        """
+        Test that every request in a batch is logged as a success or an error, and that any error raises
+        BatchRequestError once the whole batch has been processed.
+        """
+        test_client = self._make_client([
+            # First, the batch request is made.
             ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_foobarbaz"'}, batch_response),
         ])
-        test_client = DriveApi('non-existent-secrets.json', http=http_mock_sequence)
-
-        if sys.version_info < (3, 4):
-            # This is a simple smoke-test without checking the output because python <3.4 doesn't support assertLogs.
+        log_counts = self._count_log_messages('Successfully processed request', 'Error processing request')
+        if num_errors:
             with self.assertRaises(BatchRequestError):
-                test_client.list_permissions_for_files(fake_file_ids)
+                getattr(test_client, method_name)(method_arg)
         else:
-            # This is the full test case, which only runs under python 3.4+.
-            with self.assertLogs(level='INFO') as captured_logs:  # pylint: disable=no-member
-                with self.assertRaises(BatchRequestError):
-                    test_client.list_permissions_for_files(fake_file_ids)
-            assert sum('Successfully processed request' in msg for msg in captured_logs.output) == 2
-            assert sum('Error processing request' in msg for msg in captured_logs.output) == 1
+            getattr(test_client, method_name)(method_arg)
+        assert log_counts['Successfully processed request'] == num_successes
+        assert log_counts['Error processing request'] == num_errors